@@ -3,10 +3,14 @@ import sys
 import asyncio
 import subprocess
 import re
+import json
+import hashlib
+import shutil
+import functools
 from datetime import datetime
+import aiofiles
 from dotenv import load_dotenv
-from google import genai
-from playwright.async_api import async_playwright
+import lameenc
 
 # Load environment variables
 load_dotenv()
@@ -17,6 +21,34 @@ TTS_MODEL = os.getenv("TTS_MODEL", "gemini-2.5-flash-preview-tts")  # Default to
 POCKET_CASTS_EMAIL = os.getenv("POCKET_CASTS_EMAIL")
 POCKET_CASTS_PASSWORD = os.getenv("POCKET_CASTS_PASSWORD")
 
+# Directory of this script; generated files and caches live next to it
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Plugin directory for the context-a8c plugin, which provides the /digest command
+CONTEXT_A8C_PLUGIN_DIR = os.path.expanduser(
+    "~/.claude/plugins/marketplaces/automattic-claude-code-plugins/plugins/context-a8c"
+)
+
+# Long scripts are split at speaker turns into chunks of about this size and
+# synthesized with parallel Gemini TTS requests
+TTS_CHUNKING_THRESHOLD = 3000
+TTS_CHUNK_TARGET_CHARS = 1500
+TTS_MAX_CONCURRENT_REQUESTS = 4
+
+# Cached Claude output: podcast scripts (one per day) and filename summaries (one per digest)
+REWRITTEN_DIR = os.path.join(BASE_DIR, 'rewritten_digests')
+
+# Filename summaries are generated from the start of the digest only, and cached by
+# its content. Titles from rewrite_and_summarize share this cache, so bump the
+# version when either the summary prompt or that prompt's title rules change
+SUMMARY_INPUT_CHARS = 1500
+SUMMARY_CACHE_DIR = os.path.join(REWRITTEN_DIR, '.summary_cache')
+SUMMARY_CACHE_VERSION = 2
+
+# Pocket Casts API, and today's login token saved so later runs can skip logging in
+POCKET_CASTS_API = 'https://api.pocketcasts.com'
+POCKET_CASTS_TOKEN_FILE = os.path.join(BASE_DIR, '.pc_token.json')
+
 if not GOOGLE_API_KEY:
     print("Error: GOOGLE_API_KEY not found in environment variables.")
     sys.exit(1)
@@ -25,44 +57,175 @@ if not POCKET_CASTS_EMAIL or not POCKET_CASTS_PASSWORD:
     print("Error: POCKET_CASTS_EMAIL or POCKET_CASTS_PASSWORD not found in environment variables.")
     sys.exit(1)
 
+# Markdown stripped before TTS. Links go first, in their own pass, because their text
+# can hold further markup; everything else is then stripped in a single scan:
+# bare URLs, bold italic (group 1), bold (group 2), italic (group 3), headers.
+# Matches are length-capped and kept to one line, so stray markers can't cause long rescans
+_RE_MD_LINK = re.compile(r'\[([^\]\n]{1,200})\]\([^)\n]{1,500}\)')
+_RE_MARKDOWN = re.compile(
+    r'https?://\S+'
+    r'|\*\*\*([^*\n]{1,200}?)\*\*\*'
+    r'|\*\*([^*\n]{1,200}?)\*\*'
+    r'|(?<!\*)\*([^*\n]{1,200}?)\*(?!\*)'
+    r'|^#+\s+',
+    re.MULTILINE,
+)
+# Each markdown pattern needs at least one of these substrings to match
+_MD_MARKERS = ('[', '://', '*', '#')
+
+def _replace_markdown(match):
+    """Keeps the text of emphasis and drops URLs and header markers."""
+    inner = match.group(1) or match.group(2) or match.group(3)
+    if not inner:
+        return ''
+    # Emphasis can wrap a URL, e.g. **see https://example.com**
+    return _RE_MARKDOWN.sub(_replace_markdown, inner)
+
 def clean_markdown_for_tts(text):
     """Remove markdown links and other formatting that doesn't work well with TTS."""
+    # Plain text (e.g. an already rewritten script) can't match any pattern below
+    if not any(marker in text for marker in _MD_MARKERS):
+        return text.strip()
+    
     # Remove markdown links but keep the link text
     # Pattern: [text](url) -> text
-    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-    
-    # Remove standalone URLs
-    text = re.sub(r'https?://\S+', '', text)
-    
-    # Remove markdown bold/italic markers
-    text = re.sub(r'\*\*([^\*]+)\*\*', r'\1', text)
-    text = re.sub(r'\*([^\*]+)\*', r'\1', text)
+    if '[' in text:
+        text = _RE_MD_LINK.sub(r'\1', text)
     
-    # Remove markdown headers (keep the text)
-    text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
-    
-    return text.strip()
+    return _RE_MARKDOWN.sub(_replace_markdown, text).strip()
 
-def rewrite_digest_with_claude(text, language_code="en"):
-    """Rewrites the digest text using Claude to be more conversational and remove links."""
-    # Check if rewritten digest already exists for today
-    rewritten_dir = os.path.join(os.path.dirname(__file__), 'rewritten_digests')
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    rewritten_file = os.path.join(rewritten_dir, f'{date_str}.txt')
-    
-    if os.path.exists(rewritten_file):
-        print(f"Rewritten digest already exists: {rewritten_file}")
-        with open(rewritten_file, 'r', encoding='utf-8') as f:
-            return f.read()
-    
-    print("Rewriting digest with Claude (Podcast style)...")
-    
+# Directories already created during this run
+_ensured_dirs = set()
+
+def ensure_dir(path):
+    """Creates a directory unless it was already ensured during this run."""
+    if path not in _ensured_dirs:
+        os.makedirs(path, exist_ok=True)
+        _ensured_dirs.add(path)
+
+def temp_path_for(path):
+    """Returns a temporary file name next to path, unique to this process."""
+    # Concurrent runs each write their own file, then the last os.replace wins
+    return f'{path}.tmp.{os.getpid()}'
+
+async def write_text_atomic(path, text, mode=None):
+    """Writes a text file via a temporary file, so an interrupted run never leaves a truncated cache.
+
+    If mode is given, the file is created with those permissions before anything is written to it.
+    """
+    ensure_dir(os.path.dirname(path))
+    tmp_path = temp_path_for(path)
+    if mode is not None:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        # Also covers a temporary file left over by an earlier run
+        os.fchmod(fd, mode)
+        os.close(fd)
+    async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+        await f.write(text)
+    os.replace(tmp_path, path)
+
+async def read_text(path):
+    """Returns the contents of a text file, or None if it doesn't exist."""
+    # Just try to open it, rather than checking for it first and then opening it
+    try:
+        async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+            return await f.read()
+    except FileNotFoundError:
+        return None
+
+async def run_claude(args, timeout=None):
+    """Runs claude CLI in print mode without blocking the event loop and returns its stdout."""
+    cmd = ['claude', '-p', *args]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr.decode('utf-8', errors='replace'))
+    # Decode the raw pipe bytes exactly once; a stray invalid byte shouldn't abort the run
+    return stdout.decode('utf-8', errors='replace').strip()
+
+async def stream_claude(args, timeout=None, on_text=None):
+    """Runs claude CLI with stream-json output, showing progress while the response is generated.
+
+    If on_text is given, it is called with each piece of response text as soon as Claude
+    writes it. Returns the final response text, same as plain `claude -p` would print.
+    """
+    cmd = ['claude', '-p', '--output-format=stream-json', '--verbose']
+    if on_text:
+        cmd.append('--include-partial-messages')
+    cmd.extend(args)
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=16 * 1024 * 1024  # Single events can carry whole messages
+    )
+
+    # Drain stderr alongside stdout so a chatty stderr can't stall the pipe
+    stderr_task = asyncio.create_task(proc.stderr.read())
+
+    async def consume():
+        text_parts = []
+        result = None
+        try:
+            async for line in proc.stdout:
+                try:
+                    event = json.loads(line.decode('utf-8', errors='replace'))
+                except json.JSONDecodeError:
+                    continue
+                if event.get('type') == 'assistant':
+                    for block in event.get('message', {}).get('content', []):
+                        if block.get('type') == 'text':
+                            text_parts.append(block['text'])
+                            print('.', end='', flush=True)
+                elif event.get('type') == 'stream_event' and on_text:
+                    delta = event.get('event', {}).get('delta', {})
+                    if delta.get('type') == 'text_delta':
+                        on_text(delta['text'])
+                elif event.get('type') == 'result':
+                    result = event.get('result')
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            # An event line over the stream limit can't be read; fail like a crashed run
+            print()
+            proc.kill()
+            await proc.wait()
+            stderr = (await stderr_task).decode('utf-8', errors='replace')
+            raise subprocess.CalledProcessError(
+                proc.returncode, cmd, ''.join(text_parts), f"Error reading Claude output: {e}\n{stderr}"
+            )
+        await proc.wait()
+        print()
+        return result if result is not None else ''.join(text_parts)
+
+    try:
+        output = await asyncio.wait_for(consume(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        stderr_task.cancel()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    stderr = await stderr_task
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output, stderr.decode('utf-8', errors='replace'))
+    return output.strip()
+
+def podcast_script_instructions(language_code="en"):
+    """Returns the host descriptions and script rules shared by the rewrite prompts."""
     language_instruction = ""
     if language_code != "en":
         language_instruction = f"\n    IMPORTANT: Write the entire script in {language_code} language."
     
-    prompt = f"""You are writing a podcast script based on a work digest. 
-    There are two hosts:
+    return f"""There are two hosts:
     1. Sarah (Female): Enthusiastic, leads the conversation, introduces topics.
     2. Mike (Male): Analytical, adds depth, asks clarifying questions or provides details.
 
@@ -75,7 +238,35 @@ def rewrite_digest_with_claude(text, language_code="en"):
        Mike: [Text]
     3. Keep it conversational and natural.
     4. Start with a catchy intro.
-    5. Do NOT mention specific dates unless explicitly stated.
+    5. Do NOT mention specific dates unless explicitly stated."""
+
+def rewritten_script_file(run_date=None):
+    """Returns the cached podcast script file for the run's date (today by default)."""
+    run_date = run_date or datetime.now()
+    return os.path.join(REWRITTEN_DIR, f'{run_date.strftime("%Y-%m-%d")}.txt')
+
+def is_podcast_script(text):
+    """Returns whether the text already reads as a Sarah/Mike script, judging by its start."""
+    return any(line.startswith(('Sarah:', 'Mike:')) for line in text[:500].splitlines())
+
+async def rewrite_digest_with_claude(text, language_code="en", run_date=None):
+    """Rewrites the digest text using Claude to be more conversational and remove links."""
+    # Check if rewritten digest already exists for today
+    rewritten_file = rewritten_script_file(run_date)
+    
+    if is_podcast_script(text):
+        print("Digest is already a podcast script, skipping the rewrite.")
+        return clean_markdown_for_tts(text)
+    
+    rewritten = await read_text(rewritten_file)
+    if rewritten is not None:
+        print(f"Rewritten digest already exists: {rewritten_file}")
+        return rewritten
+    
+    print("Rewriting digest with Claude (Podcast style)...")
+    
+    prompt = f"""You are writing a podcast script based on a work digest. 
+    {podcast_script_instructions(language_code)}
     6. Output ONLY the script. Do NOT add any commentary, explanations, questions, or meta-text before or after the script.
     7. Start your response directly with "Sarah:" - no preamble.
     
@@ -84,20 +275,11 @@ def rewrite_digest_with_claude(text, language_code="en"):
     """
     
     try:
-        # Run claude in print mode
-        result = subprocess.run(
-            ['claude', '-p', prompt],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        rewritten = result.stdout.strip()
+        # Run claude in print mode, streaming the script as it is written
+        rewritten = await stream_claude([prompt])
         
         # Save rewritten text to dated file in rewritten_digests directory
-        os.makedirs(rewritten_dir, exist_ok=True)
-        
-        with open(rewritten_file, 'w', encoding='utf-8') as f:
-            f.write(rewritten)
+        await write_text_atomic(rewritten_file, rewritten)
         print(f"Rewritten text saved to: {rewritten_file}")
         
         return rewritten
@@ -110,15 +292,13 @@ def rewrite_digest_with_claude(text, language_code="en"):
         print("Error: 'claude' CLI not found.")
         return clean_markdown_for_tts(text)
 
-def generate_summary_from_digest(text, language_code="en"):
-    """Generate a one-sentence summary of the digest using Claude."""
-    print("Generating summary for filename...")
-    
+def build_summary_prompt(text, language_code="en"):
+    """Builds the Claude prompt for a short filename summary of the digest."""
     language_instruction = ""
     if language_code != "en":
         language_instruction = f"\n- Write the summary in {language_code} language."
     
-    prompt = f"""Generate a brief, descriptive one-sentence summary (max 8 words) of this work digest for use in a filename.
+    return f"""Generate a brief, descriptive one-sentence summary (max 8 words) of this work digest for use in a filename.
     
 Guidelines:
 - Focus on the most important or interesting items
@@ -128,57 +308,196 @@ Guidelines:
 - Example: "WooCommerce builds and model migrations"{language_instruction}
     
 Digest:
-{text[:2000]}
+{text[:SUMMARY_INPUT_CHARS]}
 """
+
+def clean_summary(summary):
+    """Strips quotes and trailing punctuation from a summary and limits its length."""
+    # Clean up any quotes or punctuation
+    summary = summary.strip().strip('"\'').rstrip('.!?')
+    # Limit length
+    if len(summary) > 60:
+        summary = summary[:57] + '...'
+    return summary
+
+def summary_cache_file(text, language_code="en"):
+    """Returns the summary cache file for a digest, keyed by its content rather than the date."""
+    key = hashlib.blake2b(text[:SUMMARY_INPUT_CHARS].encode('utf-8'), digest_size=8).hexdigest()
+    return os.path.join(SUMMARY_CACHE_DIR, f'v{SUMMARY_CACHE_VERSION}_{key}_{language_code}')
+
+async def generate_summary_from_digest(text, language_code="en"):
+    """Generate a one-sentence summary of the digest using Claude."""
+    # Check if a summary of this digest already exists, whichever day it was made on
+    summary_file = summary_cache_file(text, language_code)
+    
+    cached_summary = await read_text(summary_file)
+    if cached_summary:
+        print(f"Summary already exists: {summary_file}")
+        return cached_summary
+    
+    print("Generating summary for filename...")
+    prompt = build_summary_prompt(text, language_code)
     
     try:
-        result = subprocess.run(
-            ['claude', '-p', prompt],
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=30
-        )
-        summary = result.stdout.strip()
-        # Clean up any quotes or punctuation
-        summary = summary.strip('"\'').rstrip('.!?')
-        # Limit length
-        if len(summary) > 60:
-            summary = summary[:57] + '...'
+        summary = clean_summary(await run_claude([prompt], timeout=15))
+        await write_text_atomic(summary_file, summary)
         return summary
     except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
         print(f"Error generating summary: {e}")
         # Fallback to simple extraction
         return "Work Digest"
 
-def get_digest_text():
+async def rewrite_and_summarize(text, script_chunks, language_code="en", run_date=None):
+    """Rewrites the digest as a podcast script and summarizes it for the filename in one Claude call.
+
+    The response is streamed: a "Title:" line followed by the script. The script is put
+    on script_chunks in TTS-sized pieces (cut between speaker turns) while Claude is
+    still writing, followed by None once it is complete, so audio generation can start
+    early. None is not queued if this raises, so the caller has to watch for that
+    rather than just wait for the queue to end. If the call fails before any of the script was queued, falls back to separate
+    rewrite and summary calls (run concurrently) and queues their script instead; the
+    same calls handle a digest that is already a podcast script. Returns
+    (rewritten_text, title), where rewritten_text is the queued chunks joined with
+    join_script_chunks.
+    """
+    # Resolve the date once, so the fallback below caches under the same day
+    run_date = run_date or datetime.now()
+    rewritten_file = rewritten_script_file(run_date)
+    # The script is written here as it streams in, and moved into place once complete
+    partial_rewritten_file = temp_path_for(rewritten_file)
+    summary_file = summary_cache_file(text, language_code)
+    
+    title_language_instruction = ""
+    if language_code != "en":
+        title_language_instruction = f" Write the title in {language_code} language."
+    
+    # The title is cached as the filename summary, see SUMMARY_CACHE_VERSION
+    prompt = f"""You are writing a podcast script based on a work digest, plus a short title for it.
+    {podcast_script_instructions(language_code)}
+    6. Start your response with a single line "Title: <title>". The title is a brief, descriptive one-sentence
+       summary (max 8 words) of the most important or interesting items, with no punctuation at the end,
+       e.g. "WooCommerce builds and model migrations".{title_language_instruction}
+    7. After the title line, output ONLY the script, starting directly with "Sarah:". Do NOT add any
+       commentary, explanations, questions, or meta-text before or after the script.
+    
+    Digest:
+    {text}
+    """
+    
+    queued = []
+    chunk_lines = []
+    chunk_len = 0
+    pending = ''  # Partial line not yet terminated by a newline
+    title = None
+    seen_first_line = False
+    streamed = False  # Whether any partial message text arrived
+    
+    def queue_chunk():
+        nonlocal chunk_lines, chunk_len
+        chunk = '\n'.join(chunk_lines).strip()
+        if chunk:
+            script_file.write(('\n' if queued else '') + chunk)
+            queued.append(chunk)
+            script_chunks.put_nowait(chunk)
+        chunk_lines = []
+        chunk_len = 0
+    
+    def add_line(line):
+        nonlocal title, seen_first_line, chunk_len
+        if not seen_first_line:
+            if not line.strip():
+                return
+            seen_first_line = True
+            if line.startswith('Title:'):
+                title = clean_summary(line[len('Title:'):])
+                return
+        if starts_new_chunk(chunk_len, line):
+            queue_chunk()
+        chunk_lines.append(line)
+        chunk_len += len(line) + 1
+    
+    def on_text(delta):
+        nonlocal pending, streamed
+        streamed = True
+        *lines, pending = (pending + delta).split('\n')
+        for line in lines:
+            add_line(line)
+    
+    try:
+        if is_podcast_script(text):
+            # Nothing to rewrite, the summary call below is still needed for the title
+            print("Digest is already a podcast script, skipping the rewrite.")
+        else:
+            print("Rewriting digest and generating summary with Claude...")
+            ensure_dir(REWRITTEN_DIR)
+            with open(partial_rewritten_file, 'w', encoding='utf-8') as script_file:
+                try:
+                    output = await stream_claude([prompt], on_text=on_text)
+                    if not streamed:
+                        # No partial messages were streamed, so work from the final text
+                        on_text(output)
+                    add_line(pending)
+                    queue_chunk()
+                    if not queued:
+                        print("Claude returned an empty script.")
+                except (subprocess.CalledProcessError, FileNotFoundError) as e:
+                    print(f"Error rewriting and summarizing with Claude: {e}")
+                    # Audio for the partial script is already being generated, let the caller decide
+                    if queued:
+                        raise
+            if not queued:
+                print("Falling back to separate rewrite and summary calls...")
+        
+        if not queued:
+            rewritten, title = await asyncio.gather(
+                rewrite_digest_with_claude(text, language_code=language_code, run_date=run_date),
+                generate_summary_from_digest(text, language_code=language_code)
+            )
+            for chunk in tts_script_chunks(rewritten):
+                queued.append(chunk)
+                script_chunks.put_nowait(chunk)
+            script_chunks.put_nowait(None)
+            return join_script_chunks(queued), title
+        
+        script_chunks.put_nowait(None)
+        rewritten = join_script_chunks(queued)
+        os.replace(partial_rewritten_file, rewritten_file)
+        print(f"Rewritten text saved to: {rewritten_file}")
+        
+        if title:
+            await write_text_atomic(summary_file, title)
+        else:
+            print("Claude didn't provide a title.")
+            title = await generate_summary_from_digest(text, language_code=language_code)
+        
+        return rewritten, title
+    finally:
+        # Left over only if the script wasn't completed
+        try:
+            os.remove(partial_rewritten_file)
+        except FileNotFoundError:
+            pass
+
+async def get_digest_text():
     """Runs claude CLI with the digest slash command to get the digest text."""
     print("Generating digest text using Claude /digest command...")
     try:
-        # Plugin directory for the context-a8c plugin
-        plugin_dir = os.path.expanduser("~/.claude/plugins/marketplaces/automattic-claude-code-plugins/plugins/context-a8c")
-
-        if not os.path.exists(plugin_dir):
-            print(f"Error: Plugin directory not found at {plugin_dir}")
+        if not os.path.isdir(CONTEXT_A8C_PLUGIN_DIR):
+            print(f"Error: Plugin directory not found at {CONTEXT_A8C_PLUGIN_DIR}")
             sys.exit(1)
 
-        print(f"Running Claude CLI with plugin from {plugin_dir}")
+        print(f"Running Claude CLI with plugin from {CONTEXT_A8C_PLUGIN_DIR}")
 
         # Use the slash command with plugin-dir flag
         # Add instructions to skip interactive questions and auto-save
-        result = subprocess.run(
+        return await stream_claude(
             [
-                'claude', '-p',
-                '--plugin-dir', plugin_dir,
+                '--plugin-dir', CONTEXT_A8C_PLUGIN_DIR,
                 '--dangerously-skip-permissions',
                 '--', '/context-a8c:digest Generate a new digest for today, do not ask any questions, automatically save to the default location'
             ],
-            capture_output=True,
-            text=True,
-            check=True,
             timeout=600  # 10 minute timeout
         )
-        return result.stdout.strip()
     except subprocess.TimeoutExpired:
         print("Warning: Claude digest generation timed out after 10 minutes.")
         return ""
@@ -190,6 +509,13 @@ def get_digest_text():
         print("Error: 'claude' CLI not found.")
         sys.exit(1)
 
+def split_turn(line):
+    """Returns (speaker, text) if a stripped line is a "Speaker: text" turn, else None."""
+    speaker, sep, text = line.partition(':')
+    if sep and speaker.isascii() and speaker.isalnum() and text.strip():
+        return speaker, text
+    return None
+
 def parse_script_to_turns(script):
     """Parse a script with 'Speaker: text' format into structured turns."""
     turns = []
@@ -201,9 +527,9 @@ def parse_script_to_turns(script):
             continue
 
         # Match pattern "Speaker: text"
-        match = re.match(r'^([A-Za-z0-9]+):\s*(.+)$', line)
-        if match:
-            speaker, text = match.groups()
+        turn = split_turn(line)
+        if turn:
+            speaker, text = turn
             turns.append({
                 'speaker': speaker,
                 'text': text.strip()
@@ -215,191 +541,379 @@ def parse_script_to_turns(script):
 
     return turns
 
-async def generate_audio(text, output_file="digest.mp3"):
-    """Generates audio from text using Google Gemini API with multi-speaker support."""
-    print(f"Generating audio with Gemini multi-speaker TTS (Model: {TTS_MODEL})...")
-    print("  Female voice (Sarah): Callirrhoe")
-    print("  Male voice (Mike): Charon")
+def starts_new_chunk(chunk_len, line, target_chars=TTS_CHUNK_TARGET_CHARS):
+    """Returns whether a script chunk of chunk_len chars should end before line."""
+    # Cut only where a new speaker turn starts, once the chunk is big enough
+    return chunk_len >= target_chars and split_turn(line.strip()) is not None
 
-    try:
-        from google import genai
-        from google.genai import types
+def join_script_chunks(chunks):
+    """Joins script chunks back into the script, the inverse of split_script_into_chunks."""
+    return '\n'.join(chunks)
 
-        client = genai.Client(api_key=GOOGLE_API_KEY)
+def split_script_into_chunks(text, target_chars=TTS_CHUNK_TARGET_CHARS):
+    """Split a podcast script into chunks of about target_chars, only ever between speaker turns.
 
-        # Optimized prompt for 2-speaker podcast
-        language_instruction = ""
-        if SUMMARY_LANG != "en":
-            language_instruction = f"Speak in {SUMMARY_LANG} language. "
+    The lines are kept as they are, so join_script_chunks gives back the script.
+    """
+    chunks = []
+    current = []
+    current_len = 0
+    for line in text.split('\n'):
+        if starts_new_chunk(current_len, line, target_chars):
+            chunks.append('\n'.join(current))
+            current = []
+            current_len = 0
+        current.append(line)
+        current_len += len(line) + 1
+
+    chunks.append('\n'.join(current))
+    return chunks
+
+def tts_script_chunks(text):
+    """Returns the parts of a script to synthesize as separate TTS requests."""
+    if len(text) > TTS_CHUNKING_THRESHOLD:
+        return split_script_into_chunks(text)
+    return [text]
+
+def build_tts_prompt(text):
+    """Builds the Gemini TTS prompt for (a part of) the podcast script."""
+    # Optimized prompt for 2-speaker podcast
+    language_instruction = ""
+    if SUMMARY_LANG != "en":
+        language_instruction = f"Speak in {SUMMARY_LANG} language. "
 
-        prompt = f"""{language_instruction}TTS the following conversation between Sarah and Mike:
+    return f"""{language_instruction}TTS the following conversation between Sarah and Mike:
 {text}"""
 
-        print(f"Sending request to Gemini TTS (Length: {len(prompt)} chars)...")
+@functools.cache
+def get_genai_client():
+    """Returns a shared Gemini client, so its HTTP connection pool is reused across requests."""
+    # Imported here, so runs that exit before generating audio don't pay for it
+    from google import genai
+    return genai.Client(api_key=GOOGLE_API_KEY)
+
+async def stream_tts_pcm(client, prompt, config):
+    """Yields raw PCM audio for a TTS prompt as Gemini streams it."""
+    # Async variant, so the event loop (e.g. the Pocket Casts warmup) keeps running
+    stream = await client.aio.models.generate_content_stream(
+        model=TTS_MODEL,
+        contents=prompt,
+        config=config
+    )
+
+    received_audio = False
+    last_chunk = None
+    async for chunk in stream:
+        last_chunk = chunk
+        for part in chunk.parts or []:
+            if part.inline_data and part.inline_data.data:
+                received_audio = True
+                yield part.inline_data.data
+
+    if not received_audio and last_chunk is not None:
+        print(f"Response feedback: {last_chunk.prompt_feedback}")
+
+async def generate_audio(text, output_file="digest.mp3", script_chunks=None):
+    """Generates audio from text using Google Gemini API with multi-speaker support.
+
+    Instead of text, an asyncio.Queue of script chunks ending with None can be passed as
+    script_chunks; each chunk is then synthesized as soon as it arrives. The script is
+    taken to be the chunks joined with join_script_chunks.
+    """
+    print(f"Generating audio with Gemini multi-speaker TTS (Model: {TTS_MODEL})...")
+    print("  Female voice (Sarah): Callirrhoe")
+    print("  Male voice (Mike): Charon")
 
+    try:
         # Use the configured Gemini TTS model with multi-speaker support
-        try:
-            response = client.models.generate_content(
-                model=TTS_MODEL,
-                contents=prompt,
-                config={
-                    'response_modalities': ['AUDIO'],
-                    'speech_config': {
-                        'multi_speaker_voice_config': {
-                            'speaker_voice_configs': [
-                                {
-                                    'speaker': 'Sarah',
-                                    'voice_config': {
-                                        'prebuilt_voice_config': {
-                                            'voice_name': 'Charon'  # Swapped: flash model reverses the assignments
-                                        }
-                                    }
-                                },
-                                {
-                                    'speaker': 'Mike',
-                                    'voice_config': {
-                                        'prebuilt_voice_config': {
-                                            'voice_name': 'Callirrhoe'  # Swapped: flash model reverses the assignments
-                                        }
-                                    }
+        config = {
+            'response_modalities': ['AUDIO'],
+            'speech_config': {
+                'multi_speaker_voice_config': {
+                    'speaker_voice_configs': [
+                        {
+                            'speaker': 'Sarah',
+                            'voice_config': {
+                                'prebuilt_voice_config': {
+                                    'voice_name': 'Charon'  # Swapped: flash model reverses the assignments
+                                }
+                            }
+                        },
+                        {
+                            'speaker': 'Mike',
+                            'voice_config': {
+                                'prebuilt_voice_config': {
+                                    'voice_name': 'Callirrhoe'  # Swapped: flash model reverses the assignments
                                 }
-                            ]
+                            }
                         }
-                    }
+                    ]
                 }
-            )
-        except Exception as api_error:
-            print(f"CRITICAL ERROR calling Gemini API: {api_error}")
-            # Check for common errors
-            if "429" in str(api_error):
-                print("Tip: You might have hit a rate limit or quota.")
-            elif "400" in str(api_error):
-                print("Tip: The request might be invalid or too long.")
-            raise api_error
-
-        # Check if response has parts
-        if not response.parts:
-            print("Error: No content generated in response.")
-            print(f"Response feedback: {response.prompt_feedback}")
-            sys.exit(1)
-
-        # Extract audio data (PCM format)
-        audio_data = None
-        for part in response.parts:
-            if part.inline_data and part.inline_data.data:
-                audio_data = part.inline_data.data
-                break
-
-        if audio_data:
-            # Save PCM data to temporary file
-            pcm_file = output_file.replace('.mp3', '.pcm')
-            print(f"Saving PCM audio to {pcm_file}...")
-            with open(pcm_file, "wb") as f:
-                f.write(audio_data)
-
-            # Convert PCM to MP3 using ffmpeg for better quality
-            print(f"Converting to MP3 with ffmpeg...")
-            result = subprocess.run(
-                ['ffmpeg', '-f', 's16le', '-ar', '24000', '-ac', '1', '-i', pcm_file, '-y', output_file],
-                capture_output=True,
-                text=True
-            )
-
-            if result.returncode == 0:
+            }
+        }
+
+        cache_dir = os.path.join(BASE_DIR, 'tts_cache')
+
+        def cache_file_for(script):
+            cache_key = hashlib.sha256(
+                (TTS_MODEL + json.dumps(config, sort_keys=True) + build_tts_prompt(script)).encode('utf-8')
+            ).hexdigest()
+            return os.path.join(cache_dir, f'{cache_key}.mp3')
+
+        # Reuse previously generated audio for an identical request
+        if script_chunks is None:
+            cache_file = cache_file_for(text)
+            try:
+                await asyncio.to_thread(shutil.copyfile, cache_file, output_file)
+            except FileNotFoundError:
+                pass
+            else:
+                print(f"Cached audio found: {cache_file}")
                 print(f"Audio saved to {output_file}")
-                # Clean up PCM file
-                os.remove(pcm_file)
+                return
+
+        client = get_genai_client()
+        semaphore = asyncio.Semaphore(TTS_MAX_CONCURRENT_REQUESTS)
+
+        async def fetch(prompt, queue):
+            # Hand PCM over as it arrives; None marks the end of this request's audio
+            try:
+                async with semaphore:
+                    async for pcm in stream_tts_pcm(client, prompt, config):
+                        queue.put_nowait(pcm)
+            finally:
+                queue.put_nowait(None)
+
+        # TTS requests in script order, each with the queue its audio streams into;
+        # None marks the end of the script
+        jobs = asyncio.Queue()
+        tasks = []
+        chunks = []
+
+        def start_request(chunk):
+            chunks.append(chunk)
+            prompt = build_tts_prompt(chunk)
+            print(f"Sending request {len(chunks)} to Gemini TTS (Length: {len(prompt)} chars)...")
+            queue = asyncio.Queue()
+            tasks.append(asyncio.create_task(fetch(prompt, queue)))
+            jobs.put_nowait((tasks[-1], queue))
+
+        async def dispatch():
+            # Long scripts are synthesized as several smaller requests running in parallel
+            if script_chunks is None:
+                for chunk in tts_script_chunks(text):
+                    start_request(chunk)
             else:
-                print(f"Error converting with ffmpeg: {result.stderr}")
-                print(f"PCM file saved at: {pcm_file}")
-        else:
+                while (chunk := await script_chunks.get()) is not None:
+                    start_request(chunk)
+            jobs.put_nowait(None)
+
+        tasks.append(asyncio.create_task(dispatch()))
+
+        # Encode the raw PCM (16-bit, 24 kHz, mono) to MP3 as it streams in, in
+        # script order, so the first request's audio is encoded while the rest generate
+        encoder = lameenc.Encoder()
+        encoder.set_bit_rate(64)
+        encoder.set_in_sample_rate(24000)
+        encoder.set_channels(1)
+        encoder.set_quality(2)
+
+        received_audio = False
+        pending = b''  # Trailing odd byte of a 16-bit sample split across chunks
+
+        with open(output_file, "wb") as f:
+            try:
+                while (job := await jobs.get()) is not None:
+                    task, queue = job
+                    while (pcm := await queue.get()) is not None:
+                        pcm = pending + pcm
+                        usable = len(pcm) - len(pcm) % 2
+                        pending = pcm[usable:]
+                        # Encode off the event loop so the TTS streams keep being read meanwhile
+                        f.write(await asyncio.to_thread(encoder.encode, pcm[:usable]))
+                        received_audio = True
+                    # Re-raise any API error from this request
+                    await task
+            except Exception as api_error:
+                for task in tasks:
+                    task.cancel()
+                print(f"CRITICAL ERROR calling Gemini API: {api_error}")
+                # Check for common errors
+                if "429" in str(api_error):
+                    print("Tip: You might have hit a rate limit or quota.")
+                elif "400" in str(api_error):
+                    print("Tip: The request might be invalid or too long.")
+                raise api_error
+
+            # The encoder refuses to flush if it was never given any audio
+            if received_audio:
+                f.write(encoder.flush())
+
+        if not received_audio:
             print("Error: No audio data found in response.")
-            print(response)
+            os.remove(output_file)
             sys.exit(1)
 
+        print(f"Audio saved to {output_file}")
+
+        # Keep a copy so re-runs with the same script skip the API call
+        if script_chunks is not None:
+            cache_file = cache_file_for(join_script_chunks(chunks))
+        ensure_dir(cache_dir)
+        tmp_cache_file = temp_path_for(cache_file)
+        await asyncio.to_thread(shutil.copyfile, output_file, tmp_cache_file)
+        os.replace(tmp_cache_file, cache_file)
+
     except Exception as e:
         print(f"Error generating audio: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
 
-async def upload_to_pocket_casts(file_path):
-    """Uploads the audio file to Pocket Casts."""
+def pocket_casts_headers(token):
+    """Returns the authorization headers for Pocket Casts API requests."""
+    return {'Authorization': f'Bearer {token}'}
+
+async def login_to_pocket_casts(client):
+    """Logs in to Pocket Casts and caches the token so later runs today can skip this step."""
+    print("Logging in...")
+    response = await client.post(
+        f'{POCKET_CASTS_API}/user/login',
+        json={'email': POCKET_CASTS_EMAIL, 'password': POCKET_CASTS_PASSWORD, 'scope': 'webplayer'}
+    )
+    response.raise_for_status()
+    token = response.json()['token']
+    print("Logged in.")
+
+    await write_text_atomic(
+        POCKET_CASTS_TOKEN_FILE,
+        json.dumps({'date': datetime.now().strftime("%Y-%m-%d"), 'token': token}),
+        mode=0o600  # The token grants access to the account, keep it private
+    )
+    return token
+
+async def load_cached_pocket_casts_token():
+    """Returns the Pocket Casts token cached today, or None."""
+    cached = await read_text(POCKET_CASTS_TOKEN_FILE)
+    if not cached:
+        return None
+    try:
+        cached = json.loads(cached)
+    except json.JSONDecodeError:
+        return None
+    if cached.get('date') != datetime.now().strftime("%Y-%m-%d"):
+        return None
+    return cached.get('token')
+
+async def prepare_pocket_casts_session():
+    """Opens an HTTP client and logs in to Pocket Casts (or reuses today's token).
+
+    Returns a (client, token) session, or None if it could not be prepared.
+    """
+    print("Preparing Pocket Casts session...")
+    client = None
+
+    try:
+        import httpx
+        client = httpx.AsyncClient(http2=True, timeout=120)
+
+        token = await load_cached_pocket_casts_token()
+        if token:
+            print("Using saved Pocket Casts session.")
+        else:
+            token = await login_to_pocket_casts(client)
+        return client, token
+
+    except Exception as e:
+        print(f"Error preparing Pocket Casts session: {e}")
+        import traceback
+        traceback.print_exc()
+        await close_pocket_casts_session((client, None))
+        return None
+
+async def close_pocket_casts_session(session):
+    """Closes the HTTP client of a Pocket Casts session."""
+    client, _ = session
+    if client:
+        await client.aclose()
+
+async def read_file_chunks(path, chunk_size=1024 * 1024):
+    """Yields a file's contents in chunks, so it never has to be held in memory whole."""
+    async with aiofiles.open(path, 'rb') as f:
+        while chunk := await f.read(chunk_size):
+            yield chunk
+
+async def finish_pocket_casts_upload(session, file_path):
+    """Uploads the audio file through a prepared Pocket Casts session, then closes it."""
     print("Uploading to Pocket Casts...")
-    async with async_playwright() as p:
-        # Launch browser (headless=True for production, False for debug)
-        browser = await p.chromium.launch(headless=False) 
-        context = await browser.new_context()
-        page = await context.new_page()
+    client, token = session
 
-        try:
-            print("Logging in...")
-            await page.goto("https://play.pocketcasts.com/user/login")
-            
-            # Login
-            await page.fill('input[name="email"]', POCKET_CASTS_EMAIL)
-            await page.fill('input[name="password"]', POCKET_CASTS_PASSWORD)
-            await page.click('button[type="submit"]')
-            
-            # Wait for login to complete
-            await page.wait_for_url("**/podcasts", timeout=15000)
-            print("Logged in.")
-            
-            # Navigate to Files
-            print("Navigating to Files...")
-            await page.goto("https://pocketcasts.com/uploaded-files")
-            await page.wait_for_load_state("networkidle")
-            
-            # Click "Upload New" button
-            print("Clicking 'Upload New'...")
-            await page.click('text="Upload New"')
-            await page.wait_for_timeout(1000)
-            
-            
-            # Upload file (input is hidden, so don't wait for visibility)
-            print("Uploading file...")
-            await page.set_input_files('input[type="file"]', file_path)
-            print("File selected")
-
-            # Wait for upload to complete
-            print("Waiting for upload to complete...")
-            await page.wait_for_timeout(10000)
-            
-            print("Upload process finished.")
+    try:
+        # Ask for an upload URL, the same way the web player's "Upload New" does
+        upload_request = {
+            'title': os.path.splitext(os.path.basename(file_path))[0],
+            'contentType': 'audio/mpeg',
+            'size': os.path.getsize(file_path),
+        }
+        response = await client.post(
+            f'{POCKET_CASTS_API}/files/upload/request',
+            json=upload_request,
+            headers=pocket_casts_headers(token)
+        )
+        if response.status_code == 401:
+            # Today's cached token is no longer accepted, so log in again
+            token = await login_to_pocket_casts(client)
+            response = await client.post(
+                f'{POCKET_CASTS_API}/files/upload/request',
+                json=upload_request,
+                headers=pocket_casts_headers(token)
+            )
+        response.raise_for_status()
+        upload_url = response.json()['url']
+
+        # Stream the file from disk; the upload URL needs its length up front rather
+        # than a chunked body
+        print("Uploading file...")
+        response = await client.put(
+            upload_url,
+            content=read_file_chunks(file_path),
+            headers={'Content-Type': 'audio/mpeg', 'Content-Length': str(upload_request['size'])}
+        )
+        response.raise_for_status()
+        
+        print(f"Upload process finished (HTTP {response.status_code}).")
 
-        except Exception as e:
-            print(f"Error uploading to Pocket Casts: {e}")
-            import traceback
-            traceback.print_exc()
-        finally:
-            await browser.close()
+    except Exception as e:
+        print(f"Error uploading to Pocket Casts: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        await close_pocket_casts_session(session)
 
 async def main():
     # 1. Get Digest Text
     # Instead of parsing CLI output, we read the generated file
-    today_str = datetime.now().strftime("%Y-%m-%d")
+    # Take the run's date once, so every file of this run agrees even across midnight
+    now = datetime.now()
+    today_str = now.strftime("%Y-%m-%d")
     digest_file_path = os.path.expanduser(f"~/Automattic/Daily Digests/{today_str}.md")
     
     print(f"Checking for digest file at: {digest_file_path}")
     
-    text = "" # Initialize text variable
-    
     # Check for today's digest file
-    if os.path.exists(digest_file_path):
+    text = await read_text(digest_file_path)
+    if text is not None:
         print(f"Digest file found at {digest_file_path}. Skipping generation.")
-        with open(digest_file_path, 'r') as f:
-            text = f.read()
     else:
         # Run Claude to generate the digest
         # The slash command auto-saves to the digest file, so we just need to run it
         # and then read the file it creates (don't use stdout - that's just a summary)
         print("Running Claude to generate digest...")
-        get_digest_text()  # This triggers the slash command which auto-saves
+        await get_digest_text()  # This triggers the slash command which auto-saves
         
         # Now read the file that Claude created
-        if os.path.exists(digest_file_path):
-            with open(digest_file_path, 'r') as f:
-                text = f.read()
+        text = await read_text(digest_file_path)
+        if text is not None:
             print(f"Digest loaded from {digest_file_path}")
         else:
             print(f"Error: Claude did not create digest file at {digest_file_path}")
@@ -413,35 +927,84 @@ async def main():
 
     print(f"Digest text length: {len(text)} chars")
     
-    # Rewrite digest with Claude (Podcast style)
+    # Log in to Pocket Casts in the background, so it overlaps with the
+    # Claude rewrite and audio generation below
+    session_task = asyncio.create_task(prepare_pocket_casts_session())
+    
+    # Ensure generated_audio directory exists
+    output_dir = os.path.join(BASE_DIR, 'generated_audio')
+    ensure_dir(output_dir)
+    
+    # Audio is generated before the title (and so the final filename) is known
+    partial_audio_file = temp_path_for(os.path.join(output_dir, f".{today_str}.partial.mp3"))
+    
+    # 2. Rewrite digest with Claude (Podcast style), extract title for filename
+    # (use original text for title extraction) and generate audio
     print("Rewriting digest for audio...")
-    rewritten_text = rewrite_digest_with_claude(text, language_code=SUMMARY_LANG)
-    print(f"Rewritten text length: {len(rewritten_text)} chars")
+    rewritten_text = None
+    rewritten_file = rewritten_script_file(now)
+    cached_script = await read_text(rewritten_file)
     
-    # Extract title for filename (use original text for title extraction)
-    title = generate_summary_from_digest(text, language_code=SUMMARY_LANG)
+    if cached_script is None:
+        # Pipeline the two stages: Gemini synthesizes the start of the script
+        # while Claude is still writing the rest of it
+        script_chunks = asyncio.Queue()
+        rewrite_task = asyncio.create_task(
+            rewrite_and_summarize(text, script_chunks, language_code=SUMMARY_LANG, run_date=now)
+        )
+        audio_task = asyncio.create_task(
+            generate_audio(None, partial_audio_file, script_chunks=script_chunks)
+        )
+        # A failed rewrite never ends the chunk queue, so don't just wait for the audio
+        await asyncio.wait([rewrite_task, audio_task], return_when=asyncio.FIRST_EXCEPTION)
+        rewrite_error = rewrite_task.exception() if rewrite_task.done() else None
+        if rewrite_error:
+            audio_task.cancel()
+            await asyncio.gather(audio_task, return_exceptions=True)
+            if not isinstance(rewrite_error, subprocess.CalledProcessError):
+                if os.path.exists(partial_audio_file):
+                    os.remove(partial_audio_file)
+                raise rewrite_error
+            print("Claude failed partway through the script, starting over without pipelining...")
+        else:
+            await audio_task
+            rewritten_text, title = await rewrite_task
     
-    # Generate filename with date and summary
-    date_str = datetime.now().strftime("%d %b %Y")
-    # Sanitize title for filename (keep spaces, remove special chars)
-    safe_title = re.sub(r'[^\w\s-]', '', title).strip()
+    if rewritten_text is None:
+        # Today's script is already cached (or the pipeline failed). Audio only
+        # needs the script, so start it without waiting for the summary
+        summary_task = asyncio.create_task(
+            generate_summary_from_digest(text, language_code=SUMMARY_LANG)
+        )
+        if cached_script is not None:
+            print(f"Rewritten digest already exists: {rewritten_file}")
+            rewritten_text = cached_script
+        else:
+            rewritten_text = await rewrite_digest_with_claude(text, language_code=SUMMARY_LANG, run_date=now)
+        await generate_audio(rewritten_text, partial_audio_file)
+        title = await summary_task
     
-    # Ensure generated_audio directory exists
-    output_dir = os.path.join(os.path.dirname(__file__), 'generated_audio')
-    os.makedirs(output_dir, exist_ok=True)
+    print(f"Rewritten text length: {len(rewritten_text)} chars")
+    
+    # Generate filename with date and summary
+    date_str = now.strftime("%d %b %Y")
+    # Sanitize title for filename (keep spaces, remove special chars); letters
+    # outside ASCII are kept, since the title may be in SUMMARY_LANG
+    safe_title = ''.join(c for c in title if c.isalnum() or c.isspace() or c in '_-').strip()
     
     audio_file = os.path.join(output_dir, f"{date_str} - {safe_title}.mp3")
+    os.replace(partial_audio_file, audio_file)
     print(f"Output filename: {audio_file}")
     
-    # 2. Generate Audio
-    # Using Gemini 2.0 Flash Exp for multi-speaker podcast
-    await generate_audio(rewritten_text, audio_file)
-    
     # 3. Upload
-    if os.path.exists(audio_file):
-        await upload_to_pocket_casts(audio_file)
+    session = await session_task
+    if not session:
+        print("Pocket Casts session not available, skipping upload.")
+    elif os.path.exists(audio_file):
+        await finish_pocket_casts_upload(session, audio_file)
     else:
         print("Audio file not found, skipping upload.")
+        await close_pocket_casts_session(session)
 
 if __name__ == "__main__":
     asyncio.run(main())